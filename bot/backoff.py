@@ -0,0 +1,20 @@
+import random
+
+from bot.config import RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY
+
+
+class Backoff:
+    """Экспоненциальная задержка переподключения с full jitter"""
+
+    def __init__(self, base: float = RECONNECT_BASE_DELAY, cap: float = RECONNECT_MAX_DELAY):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** self.attempt))
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
@@ -20,12 +20,88 @@ CRYPTOCURRENCIES = [
     "AVAX"
 ]
 
-# Путь к базе данных
-DATABASE_PATH = "database.db"
+# WebSocket эндпоинты Binance в порядке предпочтения (через запятую)
+BINANCE_WS_ENDPOINTS = [
+    url.strip()
+    for url in os.getenv(
+        "BINANCE_WS_ENDPOINTS",
+        "wss://stream.binance.com:9443/ws,"
+        "wss://stream.binance.com:443/ws,"
+        "wss://data-stream.binance.vision/ws",
+    ).split(",")
+    if url.strip()
+]
+
+# Переподключение к потокам Binance
+STREAM_STALE_TIMEOUT = float(os.getenv("STREAM_STALE_TIMEOUT", "30"))
+STREAM_MAX_LIFETIME = float(os.getenv("STREAM_MAX_LIFETIME", str(23 * 3600)))  # Binance рвет соединение через 24ч
+STREAM_PING_INTERVAL = float(os.getenv("STREAM_PING_INTERVAL", "20"))
+RECONNECT_BASE_DELAY = float(os.getenv("RECONNECT_BASE_DELAY", "1"))
+RECONNECT_MAX_DELAY = float(os.getenv("RECONNECT_MAX_DELAY", "60"))
+
+# Ограничения конвейера тик -> проверка -> уведомление
+# Политики очередей: drop_oldest, block, reject
+TICK_QUEUE_SIZE = int(os.getenv("TICK_QUEUE_SIZE", "1000"))
+TICK_QUEUE_POLICY = os.getenv("TICK_QUEUE_POLICY", "drop_oldest")
+TRIGGER_QUEUE_SIZE = int(os.getenv("TRIGGER_QUEUE_SIZE", "1000"))
+TRIGGER_QUEUE_POLICY = os.getenv("TRIGGER_QUEUE_POLICY", "block")
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "8"))
+PIPELINE_REPORT_INTERVAL = float(os.getenv("PIPELINE_REPORT_INTERVAL", "60"))
+
+# Деградированный режим: при загрузке CPU выше верхнего порога алерты по одной
+# криптовалюте проверяются не чаще раза в DEGRADED_EVAL_INTERVAL секунд
+CPU_HIGH_WATERMARK = float(os.getenv("CPU_HIGH_WATERMARK", "0.85"))
+CPU_LOW_WATERMARK = float(os.getenv("CPU_LOW_WATERMARK", "0.6"))
+DEGRADED_EVAL_INTERVAL = float(os.getenv("DEGRADED_EVAL_INTERVAL", "5"))
+
+# Максимум одновременных зрителей WebSocket прокси в веб-приложении
+PROXY_MAX_VIEWERS = int(os.getenv("PROXY_MAX_VIEWERS", "500"))
+
+# Путь к базе данных SQLite
+DATABASE_PATH = os.getenv("DATABASE_PATH", "database.db")
+
+# Адрес хранилища: postgresql://... для PostgreSQL, иначе используется SQLite по DATABASE_PATH
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Шардирование мониторинга цен между несколькими экземплярами бота
+MONITOR_SHARDS = int(os.getenv("MONITOR_SHARDS", "1"))
+MONITOR_SHARD_INDEX = int(os.getenv("MONITOR_SHARD_INDEX", "0"))
+
+# Адрес Telegram Bot API (локальный Bot API сервер или заглушка для тестов)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+
+# Режим webhook: если WEBHOOK_URL не задан, бот работает через long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+
+# Пул обработчиков обновлений в режиме webhook
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "32"))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "10000"))
+
+# Пакетная регистрация пользователей по /start
+USER_BATCH_SIZE = int(os.getenv("USER_BATCH_SIZE", "500"))
+USER_FLUSH_INTERVAL = float(os.getenv("USER_FLUSH_INTERVAL", "0.5"))
+
+# Кэш известных пользователей и лимит активных алертов на пользователя (0 - без лимита)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "100000"))
+MAX_ALERTS_PER_USER = int(os.getenv("MAX_ALERTS_PER_USER", "50"))
+
+# Кэш готовых JSON-ответов со списком алертов в веб-приложении
+ALERTS_CACHE_SIZE = int(os.getenv("ALERTS_CACHE_SIZE", "10000"))
+ALERTS_CACHE_TTL = float(os.getenv("ALERTS_CACHE_TTL", "5"))
+
+# Вывод профиля запуска (импорты и фазы инициализации)
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "yes")
+
 
-if not BOT_TOKEN:
-    raise ValueError("BOT_TOKEN не найден в .env файле")
+def validate_bot_config():
+    """Проверка настроек, обязательных только для процесса бота"""
+    if not BOT_TOKEN:
+        raise ValueError("BOT_TOKEN не найден в .env файле")
 
-if not MINIAPP_URL:
-    raise ValueError("MINIAPP_URL не найден в .env файле")
+    if not MINIAPP_URL:
+        raise ValueError("MINIAPP_URL не найден в .env файле")
 
@@ -1,12 +1,15 @@
 import sqlite3
 import aiosqlite
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from bot.models import User, PriceAlert
 from bot.config import DATABASE_PATH
+from bot.storage import Storage
 
 
-class Database:
+class Database(Storage):
+    """Хранилище на SQLite (по умолчанию)"""
+
     def __init__(self, db_path: str = DATABASE_PATH):
         self.db_path = db_path
 
@@ -51,6 +54,20 @@ class Database:
         
         return User(tg_id=tg_id, username=username, registration_date=datetime.fromisoformat(registration_date))
 
+    async def create_users(self, users: Iterable[Tuple[int, Optional[str]]]) -> None:
+        """Пакетное создание пользователей (tg_id, username)"""
+        registration_date = datetime.now().isoformat()
+        rows = [(tg_id, username, registration_date) for tg_id, username in users]
+        if not rows:
+            return
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany("""
+                INSERT OR IGNORE INTO users (tg_id, username, registration_date)
+                VALUES (?, ?, ?)
+            """, rows)
+            await db.commit()
+
     async def get_user(self, tg_id: int) -> Optional[User]:
         """Получение пользователя по tg_id"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -65,6 +82,37 @@ class Database:
                     )
         return None
 
+    async def get_recent_user_ids(self, limit: int) -> List[int]:
+        """tg_id последних зарегистрированных пользователей"""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT tg_id FROM users ORDER BY registration_date DESC LIMIT ?", (limit,)
+            ) as cursor:
+                return [tg_id for (tg_id,) in await cursor.fetchall()]
+
+    async def get_active_alert_counts(self, limit: int) -> Dict[int, int]:
+        """Количество активных алертов у последних зарегистрированных пользователей"""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("""
+                SELECT u.tg_id, COUNT(a.id)
+                FROM users u
+                LEFT JOIN price_alerts a ON a.user_id = u.tg_id AND a.is_active = 1
+                GROUP BY u.tg_id
+                ORDER BY u.registration_date DESC
+                LIMIT ?
+            """, (limit,)) as cursor:
+                rows = await cursor.fetchall()
+                return {tg_id: count for tg_id, count in rows}
+
+    async def count_active_alerts(self, user_id: int) -> int:
+        """Количество активных алертов пользователя"""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT COUNT(*) FROM price_alerts WHERE user_id = ? AND is_active = 1", (user_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0]
+
     async def create_alert(self, user_id: int, cryptocurrency: str, target_price: float, is_above: bool) -> PriceAlert:
         """Создание нового алерта"""
         created_at = datetime.now().isoformat()
@@ -161,7 +209,9 @@ class Database:
     async def delete_alert(self, alert_id: int) -> bool:
         """Удаление алерта (деактивация)"""
         async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("UPDATE price_alerts SET is_active = 0 WHERE id = ?", (alert_id,))
+            cursor = await db.execute(
+                "UPDATE price_alerts SET is_active = 0 WHERE id = ? AND is_active = 1", (alert_id,)
+            )
             await db.commit()
             return cursor.rowcount > 0
 
@@ -187,7 +237,9 @@ class Database:
     async def deactivate_alert(self, alert_id: int) -> bool:
         """Деактивация алерта после срабатывания"""
         async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("UPDATE price_alerts SET is_active = 0 WHERE id = ?", (alert_id,))
+            cursor = await db.execute(
+                "UPDATE price_alerts SET is_active = 0 WHERE id = ? AND is_active = 1", (alert_id,)
+            )
             await db.commit()
             return cursor.rowcount > 0
 
@@ -3,11 +3,15 @@ from aiogram.types import Message, WebAppInfo
 from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from bot.database import Database
+from bot.storage import create_storage
 from bot.config import MINIAPP_URL
+from bot.user_buffer import UserRegistrationBuffer
+from bot.user_registry import UserRegistry
 
 router = Router()
-db = Database()
+db = create_storage()
+registration_buffer = UserRegistrationBuffer(db)
+user_registry = UserRegistry(db)
 
 
 @router.message(Command("start"))
@@ -15,8 +19,10 @@ async def cmd_start(message: Message):
     """Обработчик команды /start"""
     user = message.from_user
     
-    # Регистрация пользователя в БД
-    await db.create_user(tg_id=user.id, username=user.username)
+    # Регистрация пользователя в БД (пакетная запись в фоне, повторные /start пропускаются)
+    if not user_registry.is_known(user.id):
+        registration_buffer.add(tg_id=user.id, username=user.username)
+        user_registry.add_user(user.id)
     
     # Создание кнопки для открытия MiniApp
     builder = InlineKeyboardBuilder()
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from bot.config import (
+    CPU_HIGH_WATERMARK,
+    CPU_LOW_WATERMARK,
+    DEGRADED_EVAL_INTERVAL,
+)
+
+# Политики переполнения очереди
+DROP_OLDEST = "drop_oldest"  # выбросить самый старый элемент и добавить новый
+BLOCK = "block"  # ждать, пока в очереди освободится место
+REJECT = "reject"  # отклонить новый элемент
+
+POLICIES = (DROP_OLDEST, BLOCK, REJECT)
+
+
+class BoundedQueue:
+    """Ограниченная очередь между этапами конвейера с политикой переполнения"""
+
+    def __init__(self, name: str, maxsize: int, policy: str = BLOCK,
+                 on_shed: Optional[Callable[[Any], None]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Неизвестная политика очереди {name}: {policy}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_shed = on_shed
+        self.shed = 0
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Создаем очередь лениво, внутри работающего event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        return self._queue
+
+    async def put(self, item: Any) -> bool:
+        """Добавление элемента, False если элемент отброшен"""
+        if self.policy == BLOCK:
+            await self.queue.put(item)
+            return True
+
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.shed += 1
+            if self.policy == REJECT:
+                self._shed(item)
+                return False
+            self._shed(self.queue.get_nowait())
+            self.queue.task_done()
+            self.queue.put_nowait(item)
+            return True
+
+    def _shed(self, item: Any):
+        if self.on_shed:
+            self.on_shed(item)
+
+    async def get(self) -> Any:
+        return await self.queue.get()
+
+    def task_done(self):
+        self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.queue.qsize() if self._queue else 0,
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "shed": self.shed,
+        }
+
+
+class ConnectionLimiter:
+    """Ограничение числа одновременных подключений, лишние отклоняются"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.limit:
+            self.rejected += 1
+            return False
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active = max(self.active - 1, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": self.active, "limit": self.limit, "rejected": self.rejected}
+
+
+class LoadMonitor:
+    """Отслеживание загрузки CPU процессом и переключение в деградированный режим.
+
+    В деградированном режиме алерты по одной криптовалюте проверяются
+    не чаще раза в DEGRADED_EVAL_INTERVAL секунд. Для выхода из режима
+    загрузка должна опуститься ниже нижнего порога.
+    """
+
+    def __init__(self, high: float = CPU_HIGH_WATERMARK, low: float = CPU_LOW_WATERMARK,
+                 degraded_interval: float = DEGRADED_EVAL_INTERVAL, sample_interval: float = 1.0):
+        self.high = high
+        self.low = low
+        self.degraded_interval = degraded_interval
+        self.sample_interval = sample_interval
+        self.degraded = False
+        self.cpu_usage = 0.0
+
+    @property
+    def evaluation_interval(self) -> float:
+        return self.degraded_interval if self.degraded else 0.0
+
+    async def run(self):
+        wall = time.monotonic()
+        cpu = time.process_time()
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            now_wall = time.monotonic()
+            now_cpu = time.process_time()
+            self.cpu_usage = (now_cpu - cpu) / max(now_wall - wall, 1e-6)
+            wall, cpu = now_wall, now_cpu
+
+            if not self.degraded and self.cpu_usage >= self.high:
+                self.degraded = True
+                print(f"Высокая загрузка CPU ({self.cpu_usage:.0%}), включен деградированный режим")
+            elif self.degraded and self.cpu_usage <= self.low:
+                self.degraded = False
+                print(f"Загрузка CPU снизилась ({self.cpu_usage:.0%}), деградированный режим выключен")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cpu_usage": round(self.cpu_usage, 3),
+            "degraded": self.degraded,
+            "evaluation_interval": self.evaluation_interval,
+        }
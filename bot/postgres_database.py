@@ -0,0 +1,315 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - нужен только при DATABASE_URL=postgresql://...
+    asyncpg = None
+
+from bot.models import User, PriceAlert
+from bot.storage import Storage, AlertChangeCallback
+from bot.backoff import Backoff
+
+logger = logging.getLogger(__name__)
+
+# Канал LISTEN/NOTIFY для изменений алертов, payload - user_id владельца
+ALERT_CHANGES_CHANNEL = "alert_changes"
+
+# Ключ advisory lock, чтобы несколько реплик не создавали схему одновременно
+SCHEMA_LOCK_KEY = 727_001
+
+
+class PostgresDatabase(Storage):
+    """Хранилище на PostgreSQL (asyncpg) с рассылкой изменений через LISTEN/NOTIFY"""
+
+    def __init__(self, dsn: str):
+        if asyncpg is None:
+            raise RuntimeError("Для работы с PostgreSQL установите asyncpg: pip install asyncpg")
+        self.dsn = dsn
+        self._pool: Optional["asyncpg.Pool"] = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+        self._listener: Optional["asyncpg.Connection"] = None
+        self._alert_callbacks: List[AlertChangeCallback] = []
+        self._callback_tasks: Set[asyncio.Task] = set()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def _get_pool(self) -> "asyncpg.Pool":
+        if self._pool is not None:
+            return self._pool
+        # Блокировку создаем внутри event loop; проверка и создание идут без await
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(self.dsn)
+        return self._pool
+
+    @staticmethod
+    def _row_to_alert(row) -> PriceAlert:
+        return PriceAlert(
+            id=row["id"],
+            user_id=row["user_id"],
+            cryptocurrency=row["cryptocurrency"],
+            target_price=row["target_price"],
+            is_above=row["is_above"],
+            created_at=row["created_at"],
+            is_active=row["is_active"]
+        )
+
+    async def init_db(self):
+        """Создание таблиц и триггера уведомлений"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_KEY)
+
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS users (
+                        tg_id BIGINT PRIMARY KEY,
+                        username TEXT,
+                        registration_date TIMESTAMP NOT NULL
+                    )
+                """)
+
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS price_alerts (
+                        id BIGSERIAL PRIMARY KEY,
+                        user_id BIGINT NOT NULL REFERENCES users(tg_id),
+                        cryptocurrency TEXT NOT NULL,
+                        target_price DOUBLE PRECISION NOT NULL,
+                        is_above BOOLEAN NOT NULL,
+                        created_at TIMESTAMP NOT NULL,
+                        is_active BOOLEAN NOT NULL DEFAULT TRUE
+                    )
+                """)
+
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS price_alerts_active_user_idx
+                    ON price_alerts (user_id) WHERE is_active
+                """)
+
+                await conn.execute(f"""
+                    CREATE OR REPLACE FUNCTION notify_alert_change() RETURNS trigger AS $$
+                    BEGIN
+                        IF TG_OP = 'DELETE' THEN
+                            PERFORM pg_notify('{ALERT_CHANGES_CHANNEL}', OLD.user_id::text);
+                        ELSE
+                            PERFORM pg_notify('{ALERT_CHANGES_CHANNEL}', NEW.user_id::text);
+                        END IF;
+                        RETURN NULL;
+                    END;
+                    $$ LANGUAGE plpgsql
+                """)
+
+                await conn.execute("DROP TRIGGER IF EXISTS price_alerts_notify ON price_alerts")
+                await conn.execute("""
+                    CREATE TRIGGER price_alerts_notify
+                    AFTER INSERT OR UPDATE OR DELETE ON price_alerts
+                    FOR EACH ROW EXECUTE FUNCTION notify_alert_change()
+                """)
+
+    async def create_user(self, tg_id: int, username: Optional[str] = None) -> User:
+        """Создание нового пользователя"""
+        registration_date = datetime.now()
+        pool = await self._get_pool()
+        await pool.execute("""
+            INSERT INTO users (tg_id, username, registration_date)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (tg_id) DO NOTHING
+        """, tg_id, username, registration_date)
+        return User(tg_id=tg_id, username=username, registration_date=registration_date)
+
+    async def create_users(self, users: Iterable[Tuple[int, Optional[str]]]) -> None:
+        """Пакетное создание пользователей (tg_id, username)"""
+        registration_date = datetime.now()
+        rows = [(tg_id, username, registration_date) for tg_id, username in users]
+        if not rows:
+            return
+
+        pool = await self._get_pool()
+        await pool.executemany("""
+            INSERT INTO users (tg_id, username, registration_date)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (tg_id) DO NOTHING
+        """, rows)
+
+    async def get_user(self, tg_id: int) -> Optional[User]:
+        """Получение пользователя по tg_id"""
+        pool = await self._get_pool()
+        row = await pool.fetchrow("SELECT * FROM users WHERE tg_id = $1", tg_id)
+        if row:
+            return User(
+                tg_id=row["tg_id"],
+                username=row["username"],
+                registration_date=row["registration_date"]
+            )
+        return None
+
+    async def get_recent_user_ids(self, limit: int) -> List[int]:
+        """tg_id последних зарегистрированных пользователей"""
+        pool = await self._get_pool()
+        rows = await pool.fetch("SELECT tg_id FROM users ORDER BY registration_date DESC LIMIT $1", limit)
+        return [row["tg_id"] for row in rows]
+
+    async def get_active_alert_counts(self, limit: int) -> Dict[int, int]:
+        """Количество активных алертов у последних зарегистрированных пользователей"""
+        pool = await self._get_pool()
+        rows = await pool.fetch("""
+            SELECT u.tg_id, COUNT(a.id) AS alerts
+            FROM users u
+            LEFT JOIN price_alerts a ON a.user_id = u.tg_id AND a.is_active
+            GROUP BY u.tg_id
+            ORDER BY MAX(u.registration_date) DESC
+            LIMIT $1
+        """, limit)
+        return {row["tg_id"]: row["alerts"] for row in rows}
+
+    async def count_active_alerts(self, user_id: int) -> int:
+        """Количество активных алертов пользователя"""
+        pool = await self._get_pool()
+        return await pool.fetchval(
+            "SELECT COUNT(*) FROM price_alerts WHERE user_id = $1 AND is_active", user_id
+        )
+
+    async def create_alert(self, user_id: int, cryptocurrency: str, target_price: float, is_above: bool) -> PriceAlert:
+        """Создание нового алерта"""
+        created_at = datetime.now()
+        pool = await self._get_pool()
+        alert_id = await pool.fetchval("""
+            INSERT INTO price_alerts (user_id, cryptocurrency, target_price, is_above, created_at, is_active)
+            VALUES ($1, $2, $3, $4, $5, TRUE)
+            RETURNING id
+        """, user_id, cryptocurrency, target_price, is_above, created_at)
+
+        return PriceAlert(
+            id=alert_id,
+            user_id=user_id,
+            cryptocurrency=cryptocurrency,
+            target_price=target_price,
+            is_above=is_above,
+            created_at=created_at,
+            is_active=True
+        )
+
+    async def get_user_alerts(self, user_id: int) -> List[PriceAlert]:
+        """Получение всех алертов пользователя"""
+        pool = await self._get_pool()
+        rows = await pool.fetch("""
+            SELECT * FROM price_alerts
+            WHERE user_id = $1 AND is_active
+            ORDER BY created_at DESC
+        """, user_id)
+        return [self._row_to_alert(row) for row in rows]
+
+    async def get_alert(self, alert_id: int) -> Optional[PriceAlert]:
+        """Получение алерта по ID"""
+        pool = await self._get_pool()
+        row = await pool.fetchrow("SELECT * FROM price_alerts WHERE id = $1", alert_id)
+        return self._row_to_alert(row) if row else None
+
+    async def update_alert(self, alert_id: int, cryptocurrency: Optional[str] = None,
+                           target_price: Optional[float] = None, is_above: Optional[bool] = None) -> bool:
+        """Обновление алерта"""
+        updates = []
+        params = []
+
+        for column, value in (("cryptocurrency", cryptocurrency),
+                              ("target_price", target_price),
+                              ("is_above", is_above)):
+            if value is not None:
+                params.append(value)
+                updates.append(f"{column} = ${len(params)}")
+
+        if not updates:
+            return False
+
+        params.append(alert_id)
+
+        pool = await self._get_pool()
+        await pool.execute(f"""
+            UPDATE price_alerts
+            SET {', '.join(updates)}
+            WHERE id = ${len(params)}
+        """, *params)
+        return True
+
+    async def delete_alert(self, alert_id: int) -> bool:
+        """Удаление алерта (деактивация)"""
+        return await self.deactivate_alert(alert_id)
+
+    async def get_all_active_alerts(self) -> List[PriceAlert]:
+        """Получение всех активных алертов (для мониторинга цен)"""
+        pool = await self._get_pool()
+        rows = await pool.fetch("SELECT * FROM price_alerts WHERE is_active")
+        return [self._row_to_alert(row) for row in rows]
+
+    async def deactivate_alert(self, alert_id: int) -> bool:
+        """Деактивация алерта после срабатывания"""
+        pool = await self._get_pool()
+        status = await pool.execute(
+            "UPDATE price_alerts SET is_active = FALSE WHERE id = $1 AND is_active", alert_id
+        )
+        # asyncpg возвращает статус команды вида "UPDATE 1"; 0 - алерт уже был неактивен
+        return status.split()[-1] != "0"
+
+    async def listen_alert_changes(self, callback: AlertChangeCallback) -> bool:
+        """Подписка на изменения алертов через LISTEN/NOTIFY"""
+        self._alert_callbacks.append(callback)
+        if self._listener is None:
+            await self._connect_listener()
+        return True
+
+    async def _connect_listener(self):
+        connection = await asyncpg.connect(self.dsn)
+        await connection.add_listener(ALERT_CHANGES_CHANNEL, self._on_notify)
+        connection.add_termination_listener(self._on_listener_terminated)
+        self._listener = connection
+
+    def _dispatch(self, user_id: Optional[int]):
+        for callback in self._alert_callbacks:
+            task = asyncio.create_task(callback(user_id))
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._callback_tasks.discard)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._dispatch(int(payload))
+
+    def _on_listener_terminated(self, connection):
+        if self._closing or connection is not self._listener:
+            return
+        logger.error("Соединение LISTEN с PostgreSQL потеряно, переподключение")
+        self._listener = None
+        self._reconnect_task = asyncio.create_task(self._reconnect_listener())
+
+    async def _reconnect_listener(self):
+        backoff = Backoff()
+        while not self._closing:
+            try:
+                await self._connect_listener()
+            except Exception as e:
+                delay = backoff.next_delay()
+                logger.error(f"Не удалось переподключить LISTEN: {e}, повтор через {delay:.1f} с")
+                await asyncio.sleep(delay)
+                continue
+
+            logger.info("Соединение LISTEN с PostgreSQL восстановлено")
+            # Уведомления за время обрыва потеряны, поэтому сбрасываем кэши всех пользователей
+            self._dispatch(None)
+            return
+
+    async def close(self):
+        """Закрытие соединений"""
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+            self._reconnect_task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
@@ -1,24 +1,72 @@
 import asyncio
 import json
-import websockets
-from typing import Dict
-from bot.database import Database
-from bot.config import CRYPTOCURRENCIES
-from aiogram import Bot
+import time
+import zlib
+from typing import Dict, Set, TYPE_CHECKING
+from bot.storage import Storage
+from bot.config import (
+    CRYPTOCURRENCIES,
+    MONITOR_SHARDS,
+    MONITOR_SHARD_INDEX,
+    TICK_QUEUE_SIZE,
+    TICK_QUEUE_POLICY,
+    TRIGGER_QUEUE_SIZE,
+    TRIGGER_QUEUE_POLICY,
+    NOTIFY_WORKERS,
+    PIPELINE_REPORT_INTERVAL,
+)
+from bot.models import PriceAlert
+from bot.pipeline import BoundedQueue, LoadMonitor
+from bot.stream_supervisor import StreamSupervisor
+
+if TYPE_CHECKING:
+    from aiogram import Bot
 
 
 class PriceMonitor:
-    def __init__(self, bot: Bot, db: Database):
+    def __init__(self, bot: "Bot", db: Storage):
         self.bot = bot
         self.db = db
         self.running = False
         self.current_prices: Dict[str, float] = {}
+        self.supervisor = StreamSupervisor()
+
+        # Конвейер: тики -> проверка алертов -> отправка уведомлений
+        self.ticks = BoundedQueue("ticks", TICK_QUEUE_SIZE, TICK_QUEUE_POLICY)
+        self.triggers = BoundedQueue(
+            "triggers", TRIGGER_QUEUE_SIZE, TRIGGER_QUEUE_POLICY,
+            on_shed=lambda item: self._queued_alerts.discard(item[0].id)
+        )
+        self.load = LoadMonitor()
+        # Алерты, уже поставленные в очередь уведомлений
+        self._queued_alerts: Set[int] = set()
+        # Алерты с отправленным уведомлением; хранятся, пока не пропадут из свежей
+        # выборки активных алертов, чтобы выборка, полученная до деактивации,
+        # не поставила их в очередь повторно
+        self._fired_alerts: Set[int] = set()
+        self._last_evaluated: Dict[str, float] = {}
 
     async def start(self):
         """Запуск мониторинга цен"""
         self.running = True
         active_tasks: Dict[str, asyncio.Task] = {}
-        
+        workers = [
+            asyncio.create_task(self._match_worker()),
+            asyncio.create_task(self.load.run()),
+            asyncio.create_task(self._report_loop()),
+        ]
+        workers += [asyncio.create_task(self._notify_worker()) for _ in range(NOTIFY_WORKERS)]
+
+        try:
+            await self._supervise_streams(active_tasks)
+        finally:
+            tasks = list(active_tasks.values()) + workers
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _supervise_streams(self, active_tasks: Dict[str, asyncio.Task]):
+        """Запуск и остановка потоков по набору криптовалют с активными алертами"""
         while self.running:
             try:
                 # Получаем все активные алерты
@@ -27,7 +75,9 @@ class PriceMonitor:
                 # Определяем, какие криптовалюты нужно отслеживать
                 cryptos_to_monitor = set()
                 for alert in alerts:
-                    cryptos_to_monitor.add(alert.cryptocurrency.upper())
+                    crypto = alert.cryptocurrency.upper()
+                    if self._owns(crypto):
+                        cryptos_to_monitor.add(crypto)
                 
                 # Запускаем задачи для новых криптовалют
                 for crypto in cryptos_to_monitor:
@@ -51,45 +101,57 @@ class PriceMonitor:
                 print(f"Ошибка в мониторинге: {e}")
                 await asyncio.sleep(5)
 
+    def _owns(self, cryptocurrency: str) -> bool:
+        """Криптовалюта относится к шарду этого экземпляра"""
+        if MONITOR_SHARDS <= 1:
+            return True
+        return zlib.crc32(cryptocurrency.encode()) % MONITOR_SHARDS == MONITOR_SHARD_INDEX
+
     async def _monitor_crypto(self, cryptocurrency: str):
         """Мониторинг одной криптовалюты"""
-        symbol = f"{cryptocurrency.lower()}usdt"
-        url = f"wss://stream.binance.com:9443/ws/{symbol}@ticker"
-        
-        while self.running:
+        stream_name = f"{cryptocurrency.lower()}usdt@ticker"
+
+        async for message in self.supervisor.stream(stream_name, lambda: self.running):
             try:
-                async with websockets.connect(url) as ws:
-                    print(f"Подключено к WebSocket для {cryptocurrency}")
-                    
-                    async for message in ws:
-                        if not self.running:
-                            break
-                        
-                        try:
-                            data = json.loads(message)
-                            price = float(data.get("c", 0))
-                            
-                            if price > 0:
-                                self.current_prices[cryptocurrency] = price
-                                await self._check_alerts(cryptocurrency, price)
-                        except (json.JSONDecodeError, ValueError, KeyError) as e:
-                            print(f"Ошибка обработки данных для {cryptocurrency}: {e}")
-                            continue
-                            
-            except websockets.exceptions.ConnectionClosed:
-                print(f"Соединение закрыто для {cryptocurrency}, переподключение...")
-                await asyncio.sleep(5)
+                data = json.loads(message)
+                price = float(data.get("c", 0))
+
+                if price > 0:
+                    self.current_prices[cryptocurrency] = price
+                    await self.ticks.put((cryptocurrency, price))
+            except (json.JSONDecodeError, ValueError, KeyError) as e:
+                print(f"Ошибка обработки данных для {cryptocurrency}: {e}")
+                continue
+
+    async def _match_worker(self):
+        """Проверка алертов по тикам из очереди"""
+        while True:
+            cryptocurrency, price = await self.ticks.get()
+            try:
+                # В деградированном режиме проверяем криптовалюту не чаще заданного интервала
+                interval = self.load.evaluation_interval
+                now = time.monotonic()
+                if interval and now - self._last_evaluated.get(cryptocurrency, 0.0) < interval:
+                    continue
+                self._last_evaluated[cryptocurrency] = now
+
+                await self._check_alerts(cryptocurrency, self.current_prices.get(cryptocurrency, price))
             except Exception as e:
-                print(f"Ошибка подключения для {cryptocurrency}: {e}")
-                await asyncio.sleep(5)
+                print(f"Ошибка проверки алертов для {cryptocurrency}: {e}")
+            finally:
+                self.ticks.task_done()
 
     async def _check_alerts(self, cryptocurrency: str, current_price: float):
         """Проверка алертов для конкретной криптовалюты"""
         alerts = await self.db.get_all_active_alerts()
+        # Отсутствие алерта в выборке значит, что деактивация уже видна в БД
+        self._fired_alerts.intersection_update(alert.id for alert in alerts)
         
         for alert in alerts:
             if alert.cryptocurrency.upper() != cryptocurrency.upper():
                 continue
+            if alert.id in self._queued_alerts or alert.id in self._fired_alerts:
+                continue
             
             triggered = False
             
@@ -103,23 +165,67 @@ class PriceMonitor:
                     triggered = True
             
             if triggered:
-                # Отправляем уведомление
-                direction = "выше" if alert.is_above else "ниже"
-                message = (
-                    f"🔔 Уведомление о цене!\n\n"
-                    f"Криптовалюта: {alert.cryptocurrency}\n"
-                    f"Текущая цена: ${current_price:,.2f}\n"
-                    f"Целевая цена: ${alert.target_price:,.2f}\n"
-                    f"Цена достигла значения {direction} целевой цены!"
-                )
-                
-                try:
-                    await self.bot.send_message(alert.user_id, message)
-                    # Деактивируем алерт после срабатывания
-                    await self.db.deactivate_alert(alert.id)
-                    print(f"Отправлено уведомление пользователю {alert.user_id} для {alert.cryptocurrency}")
-                except Exception as e:
-                    print(f"Ошибка отправки уведомления: {e}")
+                self._queued_alerts.add(alert.id)
+                await self.triggers.put((alert, current_price))
+
+    async def _notify_worker(self):
+        """Отправка уведомлений по сработавшим алертам"""
+        while True:
+            alert, current_price = await self.triggers.get()
+            sent = False
+            try:
+                sent = await self._notify(alert, current_price)
+            finally:
+                # Без await между ними: алерт переходит из очереди в отправленные атомарно
+                if sent:
+                    self._fired_alerts.add(alert.id)
+                self._queued_alerts.discard(alert.id)
+                self.triggers.task_done()
+
+    async def _notify(self, alert: PriceAlert, current_price: float) -> bool:
+        """Отправка уведомления и деактивация алерта, True если уведомление отправлено"""
+        direction = "выше" if alert.is_above else "ниже"
+        message = (
+            f"🔔 Уведомление о цене!\n\n"
+            f"Криптовалюта: {alert.cryptocurrency}\n"
+            f"Текущая цена: ${current_price:,.2f}\n"
+            f"Целевая цена: ${alert.target_price:,.2f}\n"
+            f"Цена достигла значения {direction} целевой цены!"
+        )
+        
+        try:
+            await self.bot.send_message(alert.user_id, message)
+        except Exception as e:
+            print(f"Ошибка отправки уведомления: {e}")
+            return False
+
+        print(f"Отправлено уведомление пользователю {alert.user_id} для {alert.cryptocurrency}")
+        try:
+            # Деактивируем алерт после срабатывания
+            await self.db.deactivate_alert(alert.id)
+        except Exception as e:
+            print(f"Ошибка деактивации алерта {alert.id}: {e}")
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        """Глубина очередей, число отброшенных элементов и состояние нагрузки"""
+        return {
+            "ticks": self.ticks.stats(),
+            "triggers": self.triggers.stats(),
+            "load": self.load.stats(),
+        }
+
+    async def _report_loop(self):
+        """Периодический вывод состояния конвейера"""
+        while True:
+            await asyncio.sleep(PIPELINE_REPORT_INTERVAL)
+            ticks = self.ticks.stats()
+            triggers = self.triggers.stats()
+            print(
+                f"Конвейер: тики {ticks['depth']}/{ticks['maxsize']} (отброшено {ticks['shed']}), "
+                f"уведомления {triggers['depth']}/{triggers['maxsize']} (отброшено {triggers['shed']}), "
+                f"CPU {self.load.cpu_usage:.0%}{', деградированный режим' if self.load.degraded else ''}"
+            )
 
     async def stop(self):
         """Остановка мониторинга"""
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, List, Tuple, TypeVar
+
+from bot.config import STARTUP_PROFILE
+
+T = TypeVar("T")
+
+
+class StartupProfiler:
+    """Замер фаз запуска процесса (импорты, инициализация, подключения)"""
+
+    def __init__(self, name: str, enabled: bool = STARTUP_PROFILE):
+        self.name = name
+        self.enabled = enabled
+        self.started_at = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_after: float = 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        """Замер синхронной фазы (например, импорта)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    async def timed(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Замер асинхронной фазы, удобно для запуска через asyncio.gather"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def ready(self):
+        """Отметка готовности процесса и вывод отчета"""
+        self.ready_after = time.perf_counter() - self.started_at
+        if self.enabled:
+            print(self.format_report())
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "process": self.name,
+            "ready_after_ms": round(self.ready_after * 1000, 1),
+            "phases_ms": {name: round(duration * 1000, 1) for name, duration in self.phases},
+        }
+
+    def format_report(self) -> str:
+        lines = [f"Профиль запуска {self.name}: готов через {self.ready_after * 1000:.1f} мс"]
+        for name, duration in self.phases:
+            lines.append(f"  {name:<30} {duration * 1000:8.1f} мс")
+        return "\n".join(lines)
@@ -0,0 +1,92 @@
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bot.models import User, PriceAlert
+from bot.config import DATABASE_URL, DATABASE_PATH
+
+# Обработчик изменения алертов, получает user_id владельца
+# или None, если изменения могли быть пропущены и сбросить нужно все
+AlertChangeCallback = Callable[[Optional[int]], Awaitable[None]]
+
+
+class Storage(ABC):
+    """Интерфейс хранилища пользователей и алертов"""
+
+    @abstractmethod
+    async def init_db(self):
+        """Создание таблиц"""
+
+    @abstractmethod
+    async def create_user(self, tg_id: int, username: Optional[str] = None) -> User:
+        """Создание нового пользователя"""
+
+    @abstractmethod
+    async def create_users(self, users: Iterable[Tuple[int, Optional[str]]]) -> None:
+        """Пакетное создание пользователей (tg_id, username)"""
+
+    @abstractmethod
+    async def get_user(self, tg_id: int) -> Optional[User]:
+        """Получение пользователя по tg_id"""
+
+    @abstractmethod
+    async def get_recent_user_ids(self, limit: int) -> List[int]:
+        """tg_id последних зарегистрированных пользователей"""
+
+    @abstractmethod
+    async def get_active_alert_counts(self, limit: int) -> Dict[int, int]:
+        """Количество активных алертов у последних зарегистрированных пользователей"""
+
+    @abstractmethod
+    async def count_active_alerts(self, user_id: int) -> int:
+        """Количество активных алертов пользователя"""
+
+    @abstractmethod
+    async def create_alert(self, user_id: int, cryptocurrency: str, target_price: float, is_above: bool) -> PriceAlert:
+        """Создание нового алерта"""
+
+    @abstractmethod
+    async def get_user_alerts(self, user_id: int) -> List[PriceAlert]:
+        """Получение всех активных алертов пользователя"""
+
+    @abstractmethod
+    async def get_alert(self, alert_id: int) -> Optional[PriceAlert]:
+        """Получение алерта по ID"""
+
+    @abstractmethod
+    async def update_alert(self, alert_id: int, cryptocurrency: Optional[str] = None,
+                           target_price: Optional[float] = None, is_above: Optional[bool] = None) -> bool:
+        """Обновление алерта"""
+
+    @abstractmethod
+    async def delete_alert(self, alert_id: int) -> bool:
+        """Удаление алерта (деактивация), False если алерт не найден или уже неактивен"""
+
+    @abstractmethod
+    async def get_all_active_alerts(self) -> List[PriceAlert]:
+        """Получение всех активных алертов"""
+
+    @abstractmethod
+    async def deactivate_alert(self, alert_id: int) -> bool:
+        """Деактивация алерта после срабатывания, False если алерт уже неактивен"""
+
+    async def listen_alert_changes(self, callback: AlertChangeCallback) -> bool:
+        """Подписка на изменения алертов из других процессов.
+
+        Возвращает False, если хранилище не умеет рассылать изменения.
+        """
+        return False
+
+    async def close(self):
+        """Освобождение соединений"""
+
+
+def create_storage(url: Optional[str] = DATABASE_URL) -> Storage:
+    """Создание хранилища по DATABASE_URL (по умолчанию - SQLite по DATABASE_PATH)"""
+    if url and url.startswith(("postgres://", "postgresql://")):
+        from bot.postgres_database import PostgresDatabase
+        return PostgresDatabase(url)
+
+    from bot.database import Database
+    if url and url.startswith("sqlite:///"):
+        return Database(url[len("sqlite:///"):])
+    return Database(DATABASE_PATH)
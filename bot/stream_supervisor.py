@@ -0,0 +1,241 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from bot.config import (
+    BINANCE_WS_ENDPOINTS,
+    STREAM_STALE_TIMEOUT,
+    STREAM_MAX_LIFETIME,
+    STREAM_PING_INTERVAL,
+)
+from bot.backoff import Backoff
+
+# Штраф к оценке эндпоинта за каждую ошибку подключения подряд (в секундах задержки)
+FAILURE_PENALTY = 10.0
+# Вес нового замера в скользящем среднем задержки ping/pong
+LATENCY_ALPHA = 0.3
+
+
+class StaleStreamError(Exception):
+    """Поток не присылал сообщений дольше допустимого"""
+
+
+@dataclass
+class EndpointHealth:
+    """Состояние эндпоинта Binance, общее для всех потоков.
+
+    Ошибки сбрасываются только новым соединением, приславшим первое сообщение:
+    данные по уже открытым соединениям не означают, что эндпоинт принимает новые.
+    """
+    url: str
+    failures: int = 0
+    latency: Optional[float] = None
+
+    def score(self) -> float:
+        """Оценка эндпоинта: чем меньше, тем лучше"""
+        return (self.latency or 0.0) + self.failures * FAILURE_PENALTY
+
+    def record_latency(self, latency: float):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency
+
+    def record_success(self):
+        """Новое соединение подключилось и получило первое сообщение"""
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+
+
+class StreamSupervisor:
+    """Супервизор WebSocket-подключений к Binance.
+
+    Переподключается с экспоненциальной задержкой и jitter, чтобы потоки
+    разных символов не переподключались одновременно, отслеживает задержку
+    ping/pong, считает поток мертвым после stale_timeout секунд без сообщений,
+    заранее переоткрывает соединение до 24-часового отключения Binance
+    и переключается на эндпоинт с лучшей оценкой.
+    """
+
+    def __init__(self, endpoints: List[str] = BINANCE_WS_ENDPOINTS,
+                 stale_timeout: float = STREAM_STALE_TIMEOUT,
+                 max_lifetime: float = STREAM_MAX_LIFETIME,
+                 ping_interval: float = STREAM_PING_INTERVAL):
+        self.endpoints: Dict[str, EndpointHealth] = {
+            url.rstrip("/"): EndpointHealth(url.rstrip("/")) for url in endpoints
+        }
+        self.stale_timeout = stale_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+
+    def pick_endpoint(self) -> EndpointHealth:
+        """Эндпоинт с лучшей оценкой (при равенстве - первый в списке)"""
+        return min(self.endpoints.values(), key=lambda endpoint: endpoint.score())
+
+    async def _ping_loop(self, ws, endpoint: EndpointHealth):
+        """Замер задержки ping/pong, закрытие соединения без ответа"""
+        try:
+            while True:
+                await asyncio.sleep(self.ping_interval)
+                started = time.monotonic()
+                pong_waiter = await ws.ping()
+                try:
+                    await asyncio.wait_for(pong_waiter, timeout=self.stale_timeout)
+                except asyncio.TimeoutError:
+                    print(f"Нет ответа на ping от {endpoint.url}, закрываем соединение")
+                    await ws.close()
+                    return
+                endpoint.record_latency(time.monotonic() - started)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Соединение уже закрыто, ошибку обработает основной цикл
+            return
+
+    async def _connect(self, endpoint: EndpointHealth, stream_name: str):
+        import websockets
+
+        url = f"{endpoint.url}/{stream_name}"
+        # Встроенный keepalive отключен, ping выполняет _ping_loop
+        ws = await websockets.connect(url, ping_interval=None)
+        print(f"Подключено к {url}")
+        return ws
+
+    async def _open_replacement(self, stream_name: str):
+        """Новое соединение для плановой замены, готово после первого сообщения"""
+        endpoint = self.pick_endpoint()
+        try:
+            ws = await self._connect(endpoint, stream_name)
+        except Exception:
+            endpoint.record_failure()
+            raise
+        try:
+            message = await asyncio.wait_for(ws.recv(), timeout=self.stale_timeout)
+        except asyncio.CancelledError:
+            await ws.close()
+            raise
+        except Exception:
+            await ws.close()
+            endpoint.record_failure()
+            raise
+        endpoint.record_success()
+        return ws, endpoint, message
+
+    @staticmethod
+    async def _discard_handover(handover: asyncio.Task):
+        """Отмена незавершенной замены или закрытие уже открытого соединения"""
+        if not handover.done():
+            handover.cancel()
+            await asyncio.gather(handover, return_exceptions=True)
+        elif not handover.cancelled() and handover.exception() is None:
+            await handover.result()[0].close()
+
+    async def stream(self, stream_name: str, running: Callable[[], bool]) -> AsyncIterator[str]:
+        """Сообщения потока stream_name (например, btcusdt@ticker) с автоматическим переподключением"""
+        backoff = Backoff()
+        # Соединение, подготовленное плановой заменой: (ws, endpoint, первое сообщение)
+        replacement = None
+
+        while running():
+            ws = None
+            handover: Optional[asyncio.Task] = None
+            recv: Optional[asyncio.Future] = None
+            pinger: Optional[asyncio.Task] = None
+
+            if replacement is not None:
+                ws, endpoint, first_message = replacement
+                replacement = None
+            else:
+                endpoint = self.pick_endpoint()
+                first_message = None
+
+            try:
+                if ws is None:
+                    ws = await self._connect(endpoint, stream_name)
+                pinger = asyncio.create_task(self._ping_loop(ws, endpoint))
+                # Подготовленное заменой соединение уже получило первое сообщение
+                confirmed = first_message is not None
+                last_message_at = time.monotonic()
+                # Разброс срока жизни, чтобы плановые замены не совпадали
+                rotate_at = last_message_at + self.max_lifetime * random.uniform(0.9, 1.0)
+
+                if first_message is not None:
+                    yield first_message
+
+                while running():
+                    now = time.monotonic()
+
+                    # Плановая замена до 24-часового отключения: новое соединение
+                    # открывается заранее, старое читается до его первого сообщения
+                    if handover is None and now >= rotate_at:
+                        print(f"Плановая замена соединения для {stream_name}")
+                        handover = asyncio.create_task(self._open_replacement(stream_name))
+                    if handover is not None and handover.done():
+                        error = handover.exception()
+                        if error is None:
+                            replacement = handover.result()
+                            handover = None
+                            break
+                        # Остаемся на старом соединении и повторяем попытку позже
+                        print(f"Не удалось заменить соединение для {stream_name}: {error}")
+                        handover = None
+                        rotate_at = now + self.stale_timeout
+
+                    if now - last_message_at >= self.stale_timeout:
+                        raise StaleStreamError(f"нет сообщений {self.stale_timeout:.0f} с")
+
+                    timeout = last_message_at + self.stale_timeout - now
+                    waiters = {asyncio.ensure_future(ws.recv())}
+                    recv = next(iter(waiters))
+                    if handover is None:
+                        timeout = min(timeout, rotate_at - now)
+                    else:
+                        waiters.add(handover)
+
+                    done, _ = await asyncio.wait(
+                        waiters, timeout=max(timeout, 0), return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if recv not in done:
+                        recv.cancel()
+                        recv = None
+                        continue
+
+                    message = recv.result()
+                    recv = None
+                    last_message_at = time.monotonic()
+
+                    # Сбрасываем задержку и ошибки эндпоинта только после первых
+                    # данных нового соединения, а не после подключения
+                    if not confirmed:
+                        confirmed = True
+                        backoff.reset()
+                        endpoint.record_success()
+                    yield message
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                endpoint.record_failure()
+                delay = backoff.next_delay()
+                print(f"Ошибка потока {stream_name} ({endpoint.url}): {e}, переподключение через {delay:.1f} с")
+            else:
+                delay = None
+            finally:
+                if recv is not None:
+                    recv.cancel()
+                if pinger is not None:
+                    pinger.cancel()
+                if handover is not None:
+                    await self._discard_handover(handover)
+                if ws is not None:
+                    await ws.close()
+
+            if delay is not None:
+                await asyncio.sleep(delay)
+
+        if replacement is not None:
+            await replacement[0].close()
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from bot.storage import Storage
+from bot.config import USER_BATCH_SIZE, USER_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class UserRegistrationBuffer:
+    """Буфер пакетной регистрации пользователей.
+
+    Обработчик /start только кладет пользователя в буфер, а запись в БД
+    выполняется одним пакетным INSERT раз в flush_interval секунд
+    или сразу по достижении batch_size.
+    """
+
+    def __init__(self, db: Storage, batch_size: int = USER_BATCH_SIZE,
+                 flush_interval: float = USER_FLUSH_INTERVAL):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, Optional[str]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, tg_id: int, username: Optional[str] = None):
+        """Добавление пользователя в очередь на запись"""
+        self._pending[tg_id] = username
+        if self._wakeup and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self):
+        """Запуск фоновой записи пачек"""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Запись накопленных пользователей в БД"""
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        try:
+            await self.db.create_users(batch.items())
+        except Exception as e:
+            logger.error(f"Ошибка пакетной регистрации пользователей: {e}")
+            # Возвращаем пачку в буфер, не затирая более свежие данные
+            for tg_id, username in batch.items():
+                self._pending.setdefault(tg_id, username)
+
+    async def stop(self):
+        """Остановка с записью оставшихся пользователей"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
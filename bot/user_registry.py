@@ -0,0 +1,141 @@
+import asyncio
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from bot.storage import Storage
+from bot.config import USER_CACHE_SIZE, MAX_ALERTS_PER_USER
+
+
+class UserRegistry:
+    """In-process реестр известных пользователей.
+
+    LRU-кэш tg_id -> количество активных алертов. Позволяет не писать в БД
+    повторную регистрацию по /start и проверять лимит алертов без запроса.
+    Количество равно None, если пользователь известен, но его алерты еще
+    не подсчитаны.
+    """
+
+    def __init__(self, db: Storage, capacity: int = USER_CACHE_SIZE,
+                 max_alerts: int = MAX_ALERTS_PER_USER):
+        self.db = db
+        self.capacity = capacity
+        self.max_alerts = max_alerts
+        self._users: "OrderedDict[int, Optional[int]]" = OrderedDict()
+        # Зарезервированные, но еще не созданные алерты
+        self._reserved: Dict[int, int] = {}
+        # Блокировки загрузки счетчика из БД, удаляются вместе с последним владельцем
+        self._locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def warm(self, with_counts: bool = True):
+        """Заполнение кэша из БД при запуске.
+
+        Без with_counts загружаются только tg_id (достаточно для is_known),
+        а количество алертов подсчитывается при первой проверке лимита.
+        """
+        if with_counts:
+            counts = await self.db.get_active_alert_counts(self.capacity)
+        else:
+            counts = dict.fromkeys(await self.db.get_recent_user_ids(self.capacity))
+        # Запрос возвращает самых новых пользователей первыми, а в LRU они должны быть в конце
+        for tg_id, count in reversed(list(counts.items())):
+            # Кэш может заполняться параллельно с обработкой запросов,
+            # записи, добавленные за это время, новее данных запроса
+            if tg_id not in self._users:
+                self._put(tg_id, count)
+
+    def _put(self, tg_id: int, count: Optional[int]):
+        self._users[tg_id] = count
+        self._users.move_to_end(tg_id)
+        if len(self._users) > self.capacity:
+            self._users.popitem(last=False)
+
+    def is_known(self, tg_id: int) -> bool:
+        """Пользователь уже зарегистрирован (по данным кэша)"""
+        if tg_id in self._users:
+            self._users.move_to_end(tg_id)
+            return True
+        return False
+
+    def add_user(self, tg_id: int):
+        """Отметка пользователя как зарегистрированного"""
+        if not self.is_known(tg_id):
+            self._put(tg_id, None)
+
+    async def ensure_user(self, tg_id: int) -> bool:
+        """Проверка существования пользователя, с обращением к БД только при промахе кэша"""
+        if self.is_known(tg_id):
+            return True
+        if await self.db.get_user(tg_id) is None:
+            return False
+        self._put(tg_id, None)
+        return True
+
+    async def _load_count(self, tg_id: int) -> int:
+        # Резервы еще не созданных алертов в БД не видны, поэтому добавляем их к счетчику
+        count = await self.db.count_active_alerts(tg_id) + self._reserved.get(tg_id, 0)
+        self._put(tg_id, count)
+        return count
+
+    def _try_reserve(self, tg_id: int, count: int) -> bool:
+        # Проверка и увеличение счетчика без await между ними
+        if self.max_alerts > 0 and count >= self.max_alerts:
+            return False
+        self._put(tg_id, count + 1)
+        self._reserved[tg_id] = self._reserved.get(tg_id, 0) + 1
+        return True
+
+    async def reserve_alert(self, tg_id: int) -> bool:
+        """Резервирование места под новый алерт с учетом лимита.
+
+        После создания алерта нужно вызвать alert_created, при ошибке - release_alert.
+        """
+        count = self._users.get(tg_id)
+        if count is None:
+            lock = self._locks.setdefault(tg_id, asyncio.Lock())
+            async with lock:
+                count = self._users.get(tg_id)
+                if count is None:
+                    count = await self._load_count(tg_id)
+                return self._try_reserve(tg_id, count)
+
+        if self._try_reserve(tg_id, count):
+            return True
+
+        # Алерты могли быть деактивированы в другом процессе (мониторинг цен),
+        # поэтому перед отказом пересчитываем по БД
+        lock = self._locks.setdefault(tg_id, asyncio.Lock())
+        async with lock:
+            return self._try_reserve(tg_id, await self._load_count(tg_id))
+
+    def _release_reservation(self, tg_id: int):
+        reserved = self._reserved.get(tg_id, 0) - 1
+        if reserved > 0:
+            self._reserved[tg_id] = reserved
+        else:
+            self._reserved.pop(tg_id, None)
+
+    def release_alert(self, tg_id: int):
+        """Отмена резерва, если алерт не был создан"""
+        self._release_reservation(tg_id)
+        self.alert_removed(tg_id)
+
+    def invalidate_count(self, tg_id: int):
+        """Сброс количества алертов (пересчитается при следующей проверке)"""
+        if tg_id in self._users:
+            self._users[tg_id] = None
+
+    def invalidate_all_counts(self):
+        """Сброс количества алертов у всех пользователей"""
+        for tg_id in self._users:
+            self._users[tg_id] = None
+
+    def alert_created(self, tg_id: int):
+        """Подтверждение резерва: алерт создан, счетчик уже учитывает его"""
+        self._release_reservation(tg_id)
+
+    def alert_removed(self, tg_id: int):
+        """Учет удаленного или сработавшего алерта"""
+        count = self._users.get(tg_id)
+        if count is not None:
+            self._put(tg_id, max(count - 1, 0))
@@ -0,0 +1,118 @@
+import asyncio
+import hmac
+import logging
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from bot.config import UPDATE_WORKERS, UPDATE_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Состояние бота: очередь обновлений и конвейер мониторинга цен
+HEALTH_PATH = "/health"
+
+
+class UpdateWorkerPool:
+    """Ограниченный пул обработчиков обновлений.
+
+    HTTP-обработчик webhook только кладет обновление в очередь и сразу
+    отвечает Telegram, а обработка идет в фиксированном числе воркеров.
+    Если очередь заполнена, обновление отклоняется и Telegram повторит
+    доставку позже.
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, workers: int = UPDATE_WORKERS,
+                 queue_size: int = UPDATE_QUEUE_SIZE):
+        self.bot = bot
+        self.dp = dp
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.rejected = 0
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Запуск воркеров"""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, update: Update) -> bool:
+        """Постановка обновления в очередь, False если очередь заполнена"""
+        try:
+            self.queue.put_nowait(update)
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+    async def _worker(self):
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Ошибка обработки обновления {update.update_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "depth": self.queue.qsize() if self.queue else 0,
+            "maxsize": self.queue_size,
+            "workers": self.workers,
+            "rejected": self.rejected,
+        }
+
+    async def stop(self, timeout: float = 10.0):
+        """Остановка с дообработкой уже принятых обновлений"""
+        if self.queue is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Не обработано обновлений при остановке: {self.queue.qsize()}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def create_webhook_app(bot: Bot, pool: UpdateWorkerPool, path: str,
+                       secret: Optional[str] = None,
+                       stats: Optional[Callable[[], Dict[str, object]]] = None) -> web.Application:
+    """aiohttp-приложение, принимающее обновления от Telegram.
+
+    GET HEALTH_PATH отдает состояние очереди обновлений и дополнительные
+    данные из stats (например, очереди мониторинга цен).
+    """
+    if not secret:
+        logger.warning("WEBHOOK_SECRET не задан: любой может отправлять обновления на webhook")
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except Exception as e:
+            logger.warning(f"Некорректное обновление: {e}")
+            return web.Response(status=400)
+
+        if not pool.submit(update):
+            return web.Response(status=503)
+        return web.Response()
+
+    async def handle_health(request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "ok",
+            "updates": pool.stats(),
+            **(stats() if stats else {}),
+        })
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    app.router.add_get(HEALTH_PATH, handle_health)
+    return app
@@ -1,12 +1,33 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
+from typing import List
 
-from bot.config import BOT_TOKEN
-from bot.database import Database
-from bot.handlers import commands
-from bot.price_monitor import PriceMonitor
+from bot.profiling import StartupProfiler
+
+profiler = StartupProfiler("bot")
+
+with profiler.phase("import aiogram"):
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.enums import ParseMode
+    from aiohttp import web
+
+with profiler.phase("import bot modules"):
+    from bot.config import (
+        BOT_TOKEN,
+        TELEGRAM_API_URL,
+        WEBHOOK_URL,
+        WEBHOOK_PATH,
+        WEBHOOK_SECRET,
+        WEBHOOK_HOST,
+        WEBHOOK_PORT,
+        validate_bot_config,
+    )
+    from bot.storage import Storage
+    from bot.handlers import commands
+    from bot.price_monitor import PriceMonitor
+    from bot.webhook import UpdateWorkerPool, create_webhook_app
 
 # Настройка логирования
 logging.basicConfig(
@@ -16,44 +37,120 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def create_bot() -> Bot:
+    """Создание бота (с поддержкой собственного адреса Bot API)"""
+    if TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+        return Bot(token=BOT_TOKEN, session=session)
+    return Bot(token=BOT_TOKEN)
+
+
+async def start_webhook(bot: Bot, dp: Dispatcher, price_monitor: PriceMonitor):
+    """Запуск приема обновлений через webhook с пулом обработчиков"""
+    pool = UpdateWorkerPool(bot, dp)
+    await pool.start()
+
+    def stats():
+        return {"startup": profiler.as_dict(), "price_monitor": price_monitor.stats()}
+
+    app = create_webhook_app(bot, pool, WEBHOOK_PATH, WEBHOOK_SECRET, stats=stats)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+
+    await bot.set_webhook(
+        url=f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info(f"Бот запущен в режиме webhook на {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    return runner, pool
+
+
+async def warm_user_cache():
+    """Заполнение кэша известных пользователей (боту нужны только tg_id, без счетчиков алертов)"""
+    try:
+        await profiler.timed("user cache warm", commands.user_registry.warm(with_counts=False))
+    except Exception as e:
+        # Без кэша /start просто повторно ставит пользователя в очередь регистрации
+        logger.error(f"Не удалось заполнить кэш пользователей: {e}")
+
+
+async def init_storage(db: Storage, price_monitor: PriceMonitor, tasks: List[asyncio.Task]):
+    """Инициализация базы данных и запуск зависящих от нее фоновых задач.
+
+    Мониторингу цен нужна только схема БД, поэтому подключения к Binance
+    открываются сразу после init_db, а кэш пользователей заполняется параллельно.
+    """
+    await profiler.timed("db init", db.init_db())
+    logger.info("База данных инициализирована")
+
+    tasks.append(asyncio.create_task(price_monitor.start()))
+    logger.info("Мониторинг цен запущен")
+    tasks.append(asyncio.create_task(warm_user_cache()))
+
+
 async def main():
+    validate_bot_config()
+
     # Инициализация бота и диспетчера
-    bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher()
-    
-    # Регистрация роутеров
-    dp.include_router(commands.router)
-    
-    # Инициализация базы данных
-    db = Database()
-    await db.init_db()
-    logger.info("База данных инициализирована")
-    
+    with profiler.phase("bot setup"):
+        bot = create_bot()
+        dp = Dispatcher()
+
+        # Регистрация роутеров
+        dp.include_router(commands.router)
+
+    # Хранилище общее с обработчиками команд
+    db = commands.db
+
     # Инициализация мониторинга цен
     price_monitor = PriceMonitor(bot, db)
-    monitor_task = None
-    
+    # Мониторинг цен и заполнение кэша пользователей
+    background_tasks: List[asyncio.Task] = []
+    runner = None
+    pool = None
+
     try:
-        # Запуск мониторинга цен в фоне
-        monitor_task = asyncio.create_task(price_monitor.start())
-        logger.info("Мониторинг цен запущен")
-        
+        # Запуск пакетной регистрации пользователей
+        await commands.registration_buffer.start()
+
+        # БД (вместе с мониторингом цен) и подготовка приема обновлений
+        # не зависят друг от друга, поэтому выполняются параллельно
+        if WEBHOOK_URL:
+            telegram_setup = start_webhook(bot, dp, price_monitor)
+        else:
+            telegram_setup = bot.delete_webhook()
+        _, webhook = await asyncio.gather(
+            init_storage(db, price_monitor, background_tasks),
+            profiler.timed("telegram setup", telegram_setup),
+        )
+        if WEBHOOK_URL:
+            runner, pool = webhook
+        profiler.ready()
+
         # Запуск бота
-        logger.info("Бот запущен")
-        await dp.start_polling(bot)
+        if WEBHOOK_URL:
+            await asyncio.Event().wait()
+        else:
+            logger.info("Бот запущен")
+            await dp.start_polling(bot)
     except KeyboardInterrupt:
         logger.info("Остановка бота...")
     finally:
-        if monitor_task:
-            monitor_task.cancel()
-            try:
-                await monitor_task
-            except asyncio.CancelledError:
-                pass
+        if runner:
+            await runner.cleanup()
+        if pool:
+            await pool.stop()
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
         await price_monitor.stop()
+        await commands.registration_buffer.stop()
+        await db.close()
         await bot.session.close()
 
 
 if __name__ == "__main__":
     asyncio.run(main())
-
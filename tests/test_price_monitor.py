@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime
+
+from bot.models import PriceAlert
+from bot.price_monitor import PriceMonitor
+
+
+class SlowDatabase:
+    """Хранилище в памяти, каждый запрос занимает delay секунд"""
+
+    def __init__(self, alerts, delay: float = 0.05):
+        self.alerts = {alert.id: alert for alert in alerts}
+        self.delay = delay
+
+    async def get_all_active_alerts(self):
+        # Выборка фиксируется в начале запроса, как снимок в транзакции
+        snapshot = [alert for alert in self.alerts.values() if alert.is_active]
+        await asyncio.sleep(self.delay)
+        return snapshot
+
+    async def deactivate_alert(self, alert_id: int) -> bool:
+        await asyncio.sleep(self.delay)
+        self.alerts[alert_id].is_active = False
+        return True
+
+
+class FakeBot:
+    def __init__(self, fail: int = 0):
+        self.sent = []
+        self.fail = fail
+
+    async def send_message(self, chat_id, text):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("Telegram недоступен")
+        self.sent.append(chat_id)
+
+
+def make_alert(alert_id: int) -> PriceAlert:
+    return PriceAlert(
+        id=alert_id,
+        user_id=100 + alert_id,
+        cryptocurrency="BTC",
+        target_price=50.0,
+        is_above=True,
+        created_at=datetime.now(),
+        is_active=True,
+    )
+
+
+async def run_ticks(monitor: PriceMonitor, count: int):
+    workers = [
+        asyncio.create_task(monitor._match_worker()),
+        asyncio.create_task(monitor._notify_worker()),
+        asyncio.create_task(monitor._notify_worker()),
+    ]
+    for _ in range(count):
+        monitor.current_prices["BTC"] = 100.0
+        await monitor.ticks.put(("BTC", 100.0))
+        await asyncio.sleep(0.02)
+    await monitor.ticks.queue.join()
+    await monitor.triggers.queue.join()
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+
+def test_alert_notifies_once_despite_stale_snapshot():
+    async def scenario():
+        db = SlowDatabase([make_alert(1)])
+        bot = FakeBot()
+        monitor = PriceMonitor(bot, db)
+
+        await run_ticks(monitor, 10)
+
+        assert bot.sent == [101]
+        assert not db.alerts[1].is_active
+        # Выборка без алерта очищает набор отправленных
+        assert monitor._fired_alerts == set()
+
+    asyncio.run(scenario())
+
+
+def test_failed_send_is_retried():
+    async def scenario():
+        db = SlowDatabase([make_alert(1)], delay=0.01)
+        bot = FakeBot(fail=1)
+        monitor = PriceMonitor(bot, db)
+
+        await run_ticks(monitor, 5)
+
+        assert bot.sent == [101]
+
+    asyncio.run(scenario())
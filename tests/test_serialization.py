@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime
+
+from bot.models import PriceAlert
+from webapp.backend.serialization import AlertListCache, encode_alerts
+
+
+def make_alert(alert_id: int) -> PriceAlert:
+    return PriceAlert(
+        id=alert_id,
+        user_id=1,
+        cryptocurrency="BTC",
+        target_price=100.0,
+        is_above=True,
+        created_at=datetime(2024, 1, 1),
+        is_active=True,
+    )
+
+
+def test_invalidation_during_read_skips_stale_fill():
+    async def scenario():
+        cache = AlertListCache(capacity=10, ttl=60)
+        alerts = [make_alert(1)]
+
+        async def read():
+            generation = cache.generation(1)
+            snapshot = list(alerts)
+            await asyncio.sleep(0.01)
+            cache.set(1, encode_alerts(snapshot), generation)
+
+        async def mutate():
+            alerts.append(make_alert(2))
+            cache.invalidate(1)
+
+        await asyncio.gather(read(), mutate())
+        assert cache.get(1) is None
+
+        generation = cache.generation(1)
+        cache.set(1, encode_alerts(alerts), generation)
+        assert cache.get(1) == encode_alerts(alerts)
+
+    asyncio.run(scenario())
+
+
+def test_evicted_generation_does_not_repeat():
+    cache = AlertListCache(capacity=1, ttl=60)
+    cache.invalidate(1)
+    generation = cache.generation(1)
+    cache.invalidate(2)  # вытесняет поколение пользователя 1
+    cache.invalidate(1)
+    cache.set(1, b"[]", generation)
+    assert cache.get(1) is None
+
+
+def test_clear_skips_fill_for_uncached_user():
+    cache = AlertListCache(capacity=10, ttl=60)
+    generation = cache.generation(1)
+    # Полный сброс (например, после переподключения LISTEN) во время запроса к БД
+    cache.clear()
+    cache.set(1, b"[]", generation)
+    assert cache.get(1) is None
+
+    cache.set(1, b"[]", cache.generation(1))
+    assert cache.get(1) == b"[]"
+
+    # Сброс пользователя после полного сброса по-прежнему учитывается
+    generation = cache.generation(1)
+    cache.invalidate(1)
+    cache.set(1, b"[1]", generation)
+    assert cache.get(1) is None
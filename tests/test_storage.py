@@ -0,0 +1,158 @@
+import asyncio
+import os
+
+import pytest
+
+from bot.database import Database
+
+# Только явно заданная тестовая база: таблицы в ней удаляются перед каждым тестом,
+# поэтому DATABASE_URL приложения (в том числе из .env) не используется
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+async def reset_postgres(dsn: str):
+    import asyncpg
+
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.execute("DROP TABLE IF EXISTS price_alerts, users CASCADE")
+    finally:
+        await connection.close()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def backend(request, tmp_path):
+    """Фабрика хранилища; PostgreSQL только при заданном локальном экземпляре"""
+    if request.param == "sqlite":
+        async def create():
+            return Database(str(tmp_path / "test.db"))
+    else:
+        if not POSTGRES_URL:
+            pytest.skip("TEST_POSTGRES_URL не задан")
+        from bot.postgres_database import PostgresDatabase
+
+        async def create():
+            await reset_postgres(POSTGRES_URL)
+            return PostgresDatabase(POSTGRES_URL)
+
+    create.name = request.param
+    return create
+
+
+def run(backend, scenario):
+    async def wrapper():
+        storage = await backend()
+        await storage.init_db()
+        try:
+            await scenario(storage)
+        finally:
+            await storage.close()
+
+    asyncio.run(wrapper())
+
+
+def test_alert_crud(backend):
+    async def scenario(db):
+        await db.create_user(1, "alice")
+        user = await db.get_user(1)
+        assert user.tg_id == 1 and user.username == "alice"
+        assert await db.get_user(2) is None
+
+        alert = await db.create_alert(1, "BTC", 100.0, True)
+        fetched = await db.get_alert(alert.id)
+        assert (fetched.user_id, fetched.cryptocurrency, fetched.target_price, fetched.is_above, fetched.is_active) == \
+            (1, "BTC", 100.0, True, True)
+
+        assert await db.update_alert(alert.id, target_price=150.0, is_above=False)
+        assert not await db.update_alert(alert.id)
+        updated = await db.get_alert(alert.id)
+        assert (updated.cryptocurrency, updated.target_price, updated.is_above) == ("BTC", 150.0, False)
+
+        other = await db.create_alert(1, "ETH", 10.0, True)
+        assert [a.id for a in await db.get_user_alerts(1)] == [other.id, alert.id]
+        assert {a.id for a in await db.get_all_active_alerts()} == {alert.id, other.id}
+
+        assert await db.delete_alert(alert.id)
+        assert not (await db.get_alert(alert.id)).is_active
+        # Повторное удаление ничего не меняет
+        assert not await db.delete_alert(alert.id)
+        assert not await db.deactivate_alert(alert.id)
+        assert [a.id for a in await db.get_user_alerts(1)] == [other.id]
+
+        assert await db.deactivate_alert(other.id)
+        assert await db.get_all_active_alerts() == []
+        assert not await db.deactivate_alert(10_000)
+
+    run(backend, scenario)
+
+
+def test_batch_users_and_alert_counts(backend):
+    async def scenario(db):
+        await db.create_users([(1, "a"), (2, "b"), (3, None)])
+        # Повторная регистрация игнорируется
+        await db.create_users([(1, "changed")])
+        await db.create_users([])
+        assert (await db.get_user(1)).username == "a"
+        assert (await db.get_user(3)).username is None
+
+        for _ in range(3):
+            await db.create_alert(1, "BTC", 1.0, True)
+        deactivated = await db.create_alert(2, "BTC", 1.0, True)
+        await db.create_alert(2, "ETH", 1.0, False)
+        await db.deactivate_alert(deactivated.id)
+
+        assert await db.count_active_alerts(1) == 3
+        assert await db.count_active_alerts(2) == 1
+        assert await db.count_active_alerts(3) == 0
+        assert await db.get_active_alert_counts(10) == {1: 3, 2: 1, 3: 0}
+        assert len(await db.get_active_alert_counts(2)) == 2
+        assert sorted(await db.get_recent_user_ids(10)) == [1, 2, 3]
+        assert len(await db.get_recent_user_ids(2)) == 2
+
+    run(backend, scenario)
+
+
+def test_listen_alert_changes(backend):
+    async def scenario(db):
+        changes = asyncio.Queue()
+
+        async def on_change(user_id):
+            await changes.put(user_id)
+
+        supported = await db.listen_alert_changes(on_change)
+        if backend.name == "sqlite":
+            assert not supported
+            return
+
+        assert supported
+        await db.create_user(42)
+        alert = await db.create_alert(42, "BTC", 1.0, True)
+        assert await asyncio.wait_for(changes.get(), timeout=5) == 42
+        await db.deactivate_alert(alert.id)
+        assert await asyncio.wait_for(changes.get(), timeout=5) == 42
+
+    run(backend, scenario)
+
+
+def test_listener_reconnects_after_connection_loss(backend):
+    if backend.name == "sqlite":
+        pytest.skip("SQLite не рассылает изменения")
+
+    async def scenario(db):
+        changes = asyncio.Queue()
+
+        async def on_change(user_id):
+            await changes.put(user_id)
+
+        await db.listen_alert_changes(on_change)
+        pool = await db._get_pool()
+        await pool.execute("SELECT pg_terminate_backend($1)", db._listener.get_server_pid())
+
+        # После восстановления кэши сбрасываются целиком
+        assert await asyncio.wait_for(changes.get(), timeout=10) is None
+
+        await db.create_user(7)
+        await db.create_alert(7, "BTC", 1.0, True)
+        assert await asyncio.wait_for(changes.get(), timeout=5) == 7
+
+    run(backend, scenario)
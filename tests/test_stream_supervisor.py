@@ -0,0 +1,200 @@
+import asyncio
+import http
+import itertools
+import socket
+import time
+
+import pytest
+import websockets
+
+from bot.backoff import Backoff
+from bot.stream_supervisor import StreamSupervisor
+
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    """Короткие задержки переподключения, чтобы тесты не ждали секундами"""
+    monkeypatch.setattr(Backoff, "next_delay", lambda self: 0.01)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def collect(stream, count: int, timeout: float = 3.0) -> list:
+    messages = []
+
+    async def read():
+        async for message in stream:
+            messages.append(message)
+            if len(messages) == count:
+                return
+
+    await asyncio.wait_for(read(), timeout)
+    await stream.aclose()
+    return messages
+
+
+def test_backoff_grows_exponentially_up_to_cap(monkeypatch):
+    backoff = Backoff(base=1.0, cap=8.0)
+    # Верхняя граница jitter
+    monkeypatch.setattr("random.uniform", lambda low, high: high)
+    assert [backoff.next_delay() for _ in range(6)] == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+    backoff.reset()
+    assert backoff.next_delay() == 1.0
+
+
+def test_backoff_jitter_stays_within_bounds():
+    backoff = Backoff(base=0.5, cap=4.0)
+    for attempt in range(20):
+        delay = backoff.next_delay()
+        assert 0 <= delay <= min(4.0, 0.5 * 2 ** attempt)
+
+
+def test_planned_rotation_opens_replacement_before_closing():
+    async def scenario():
+        connection_ids = itertools.count(1)
+        events = []
+
+        async def handler(ws, path=None):
+            connection_id = next(connection_ids)
+            events.append(("open", connection_id, time.monotonic()))
+            try:
+                for n in itertools.count():
+                    await ws.send(f"{connection_id}:{n}")
+                    await asyncio.sleep(0.02)
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            finally:
+                events.append(("close", connection_id, time.monotonic()))
+
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            supervisor = StreamSupervisor(
+                endpoints=[f"ws://127.0.0.1:{port}"],
+                stale_timeout=1.0,
+                max_lifetime=0.3,
+                ping_interval=10.0,
+            )
+
+            received = []
+            deadline = time.monotonic() + 1.5
+            stream = supervisor.stream("test", lambda: time.monotonic() < deadline)
+            async for message in stream:
+                received.append((time.monotonic(), message))
+            await asyncio.sleep(0.1)
+
+        used = sorted({int(message.split(":")[0]) for _, message in received})
+        assert len(used) >= 3
+
+        # Между сообщениями нет окна, сравнимого с переподключением
+        gaps = [b[0] - a[0] for a, b in zip(received, received[1:])]
+        assert max(gaps) < 0.15
+
+        # Каждое следующее соединение открыто до закрытия предыдущего
+        opened = {cid: t for kind, cid, t in events if kind == "open"}
+        closed = {cid: t for kind, cid, t in events if kind == "close"}
+        for previous, current in zip(used, used[1:]):
+            assert opened[current] < closed[previous]
+
+    asyncio.run(scenario())
+
+
+def test_stale_stream_is_reconnected(fast_backoff):
+    async def scenario():
+        connection_ids = itertools.count(1)
+
+        async def handler(ws, path=None):
+            # Одно сообщение, затем соединение открыто, но молчит
+            await ws.send(str(next(connection_ids)))
+            await ws.wait_closed()
+
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            supervisor = StreamSupervisor(
+                endpoints=[f"ws://127.0.0.1:{port}"],
+                stale_timeout=0.2,
+                max_lifetime=60.0,
+                ping_interval=10.0,
+            )
+
+            started = time.monotonic()
+            messages = await collect(supervisor.stream("test", lambda: True), 3)
+            elapsed = time.monotonic() - started
+
+        assert messages == ["1", "2", "3"]
+        # Переподключение только после stale_timeout без сообщений
+        assert elapsed >= 0.4
+
+    asyncio.run(scenario())
+
+
+def test_failover_to_next_endpoint(fast_backoff):
+    async def scenario():
+        async def handler(ws, path=None):
+            for n in itertools.count():
+                await ws.send(str(n))
+                await asyncio.sleep(0.01)
+
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            # Первый эндпоинт в списке не принимает подключения
+            dead = f"ws://127.0.0.1:{free_port()}"
+            live = f"ws://127.0.0.1:{port}"
+            supervisor = StreamSupervisor(endpoints=[dead, live], stale_timeout=1.0,
+                                          max_lifetime=60.0, ping_interval=10.0)
+
+            assert await collect(supervisor.stream("test", lambda: True), 3) == ["0", "1", "2"]
+
+        assert supervisor.endpoints[dead].failures == 1
+        assert supervisor.endpoints[live].failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_flowing_streams_do_not_hide_rejected_connects(fast_backoff):
+    async def scenario():
+        accepted = []
+
+        async def process_request(path, headers):
+            # Эндпоинт держит уже открытое соединение, но новые отклоняет (429)
+            if accepted:
+                return http.HTTPStatus.TOO_MANY_REQUESTS, [], b""
+            accepted.append(path)
+
+        async def handler(ws, path=None):
+            for n in itertools.count():
+                await ws.send(f"{ws.path}:{n}")
+                await asyncio.sleep(0.01)
+
+        async with websockets.serve(handler, "127.0.0.1", 0, process_request=process_request) as limited, \
+                websockets.serve(handler, "127.0.0.1", 0) as backup:
+            limited_url = f"ws://127.0.0.1:{limited.sockets[0].getsockname()[1]}"
+            backup_url = f"ws://127.0.0.1:{backup.sockets[0].getsockname()[1]}"
+            supervisor = StreamSupervisor(endpoints=[limited_url, backup_url], stale_timeout=1.0,
+                                          max_lifetime=60.0, ping_interval=10.0)
+
+            first = supervisor.stream("first", lambda: True)
+            assert await anext(first) == "/first:0"
+
+            async def keep_reading():
+                async for _ in first:
+                    pass
+
+            reader = asyncio.create_task(keep_reading())
+            try:
+                # Второй поток получает 429 и уходит на запасной эндпоинт,
+                # хотя первый поток продолжает получать данные
+                messages = await collect(supervisor.stream("second", lambda: True), 20)
+                assert messages[0] == "/second:0"
+                assert supervisor.endpoints[limited_url].failures == 1
+                assert supervisor.pick_endpoint().url == backup_url
+            finally:
+                reader.cancel()
+                await asyncio.gather(reader, return_exceptions=True)
+                await first.aclose()
+
+    asyncio.run(scenario())
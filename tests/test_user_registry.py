@@ -0,0 +1,99 @@
+import asyncio
+
+from bot.user_registry import UserRegistry
+
+
+class FakeDatabase:
+    """Хранилище в памяти с задержкой запросов"""
+
+    def __init__(self, active_alerts: int = 0, delay: float = 0.01):
+        self.active_alerts = active_alerts
+        self.delay = delay
+        self.count_queries = 0
+
+    async def get_recent_user_ids(self, limit: int):
+        return [3, 2, 1][:limit]
+
+    async def get_active_alert_counts(self, limit: int):
+        raise AssertionError("боту счетчики алертов при запуске не нужны")
+
+    async def count_active_alerts(self, user_id: int) -> int:
+        self.count_queries += 1
+        await asyncio.sleep(self.delay)
+        return self.active_alerts
+
+    async def create_alert(self):
+        await asyncio.sleep(self.delay)
+        self.active_alerts += 1
+
+
+async def create(registry: UserRegistry, db: FakeDatabase, user_id: int) -> bool:
+    if not await registry.reserve_alert(user_id):
+        return False
+    try:
+        await db.create_alert()
+    except Exception:
+        registry.release_alert(user_id)
+        raise
+    registry.alert_created(user_id)
+    return True
+
+
+def test_concurrent_creates_respect_limit():
+    async def scenario():
+        db = FakeDatabase()
+        registry = UserRegistry(db, capacity=10, max_alerts=5)
+        registry.add_user(1)
+
+        results = await asyncio.gather(*(create(registry, db, 1) for _ in range(200)))
+
+        assert sum(results) == 5
+        assert db.active_alerts == 5
+
+    asyncio.run(scenario())
+
+
+def test_release_frees_slot_after_failed_create():
+    async def scenario():
+        db = FakeDatabase(active_alerts=4)
+        registry = UserRegistry(db, capacity=10, max_alerts=5)
+        registry.add_user(1)
+
+        assert await registry.reserve_alert(1)
+        registry.release_alert(1)
+
+        assert await registry.reserve_alert(1)
+        assert not await registry.reserve_alert(1)
+
+    asyncio.run(scenario())
+
+
+def test_recount_at_limit_sees_alerts_deactivated_elsewhere():
+    async def scenario():
+        db = FakeDatabase(active_alerts=5)
+        registry = UserRegistry(db, capacity=10, max_alerts=5)
+        registry.add_user(1)
+
+        assert not await registry.reserve_alert(1)
+        # Бот деактивировал сработавший алерт в своем процессе
+        db.active_alerts = 4
+        assert await create(registry, db, 1)
+
+    asyncio.run(scenario())
+
+
+def test_warm_without_counts_keeps_newer_entries():
+    async def scenario():
+        db = FakeDatabase(active_alerts=2)
+        registry = UserRegistry(db, capacity=10, max_alerts=5)
+        # Пользователь зарегистрировался, пока кэш заполнялся
+        registry.add_user(1)
+        assert await create(registry, db, 1)
+
+        await registry.warm(with_counts=False)
+
+        assert all(registry.is_known(tg_id) for tg_id in (1, 2, 3))
+        assert registry._users[1] == 3
+        assert registry._users[2] is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from bot.database import Database
+from bot.user_registry import UserRegistry
+from webapp.backend import main
+from webapp.backend.serialization import AlertListCache
+
+USER_ID = 1
+
+
+def create_client(tmp_path, monkeypatch, max_alerts: int) -> TestClient:
+    db = Database(str(tmp_path / "test.db"))
+
+    async def prepare():
+        await db.init_db()
+        await db.create_user(USER_ID, "alice")
+
+    asyncio.run(prepare())
+    monkeypatch.setattr(main, "db", db)
+    monkeypatch.setattr(main, "user_registry", UserRegistry(db, max_alerts=max_alerts))
+    monkeypatch.setattr(main, "alerts_cache", AlertListCache())
+    return TestClient(main.app)
+
+
+def create_alert(client: TestClient):
+    return client.post(
+        "/api/alerts",
+        params={"user_id": USER_ID},
+        json={"cryptocurrency": "BTC", "target_price": 100.0, "is_above": True},
+    )
+
+
+def test_repeated_delete_does_not_bypass_limit(tmp_path, monkeypatch):
+    client = create_client(tmp_path, monkeypatch, max_alerts=3)
+
+    alert_ids = [create_alert(client).json()["id"] for _ in range(3)]
+    assert create_alert(client).status_code == 429
+
+    # Алерт сработал в боте: деактивирован в БД без участия webapp
+    assert asyncio.run(main.db.deactivate_alert(alert_ids[0]))
+
+    for _ in range(5):
+        assert client.delete(f"/api/alerts/{alert_ids[0]}", params={"user_id": USER_ID}).status_code == 404
+
+    # Место освободил только сработавший алерт
+    assert create_alert(client).status_code == 200
+    assert create_alert(client).status_code == 429
+    assert asyncio.run(main.db.count_active_alerts(USER_ID)) == 3
+
+
+def test_delete_frees_slot_once(tmp_path, monkeypatch):
+    client = create_client(tmp_path, monkeypatch, max_alerts=2)
+
+    alert_ids = [create_alert(client).json()["id"] for _ in range(2)]
+
+    assert client.delete(f"/api/alerts/{alert_ids[0]}", params={"user_id": USER_ID}).status_code == 200
+    assert client.delete(f"/api/alerts/{alert_ids[0]}", params={"user_id": USER_ID}).status_code == 404
+
+    assert create_alert(client).status_code == 200
+    assert create_alert(client).status_code == 429
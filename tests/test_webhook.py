@@ -0,0 +1,141 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram import Dispatcher
+
+import start_bot
+from bot.database import Database
+from bot.handlers import commands
+from bot.user_buffer import UserRegistrationBuffer
+from bot.user_registry import UserRegistry
+from bot.price_monitor import PriceMonitor
+from bot.webhook import HEALTH_PATH, SECRET_HEADER, UpdateWorkerPool, create_webhook_app
+
+BOT_TOKEN = "123456:TEST"
+SECRET = "test-secret"
+
+
+def start_update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "User", "username": f"user{user_id}"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+def create_telegram_stub(calls: list) -> web.Application:
+    """Заглушка Bot API: запоминает вызовы и отвечает успешно"""
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = dict(await request.post())
+        calls.append((method, data))
+        if method == "sendMessage":
+            result = {
+                "message_id": len(calls),
+                "date": 0,
+                "chat": {"id": int(data["chat_id"]), "type": "private"},
+                "text": data.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    return app
+
+
+def test_start_burst_through_webhook(tmp_path, monkeypatch):
+    async def scenario():
+        calls = []
+        async with TestServer(create_telegram_stub(calls)) as telegram:
+            monkeypatch.setattr(start_bot, "BOT_TOKEN", BOT_TOKEN)
+            monkeypatch.setattr(start_bot, "TELEGRAM_API_URL", str(telegram.make_url("")).rstrip("/"))
+            monkeypatch.setattr(commands, "MINIAPP_URL", "https://example.com")
+            # Отдельная SQLite-база, независимо от DATABASE_URL окружения
+            db = Database(str(tmp_path / "test.db"))
+            await db.init_db()
+            monkeypatch.setattr(commands, "db", db)
+
+            buffer = UserRegistrationBuffer(db, batch_size=10_000, flush_interval=60)
+            monkeypatch.setattr(commands, "registration_buffer", buffer)
+            monkeypatch.setattr(commands, "user_registry", UserRegistry(db))
+
+            batches = []
+            create_users = db.create_users
+
+            async def spy_create_users(users):
+                users = list(users)
+                batches.append(users)
+                await create_users(users)
+
+            monkeypatch.setattr(db, "create_users", spy_create_users)
+
+            bot = start_bot.create_bot()
+            dp = Dispatcher()
+            dp.include_router(commands.router)
+            pool = UpdateWorkerPool(bot, dp, workers=8, queue_size=1000)
+            await pool.start()
+            await buffer.start()
+
+            app = create_webhook_app(bot, pool, "/webhook", SECRET)
+            async with TestClient(TestServer(app)) as client:
+                denied = await client.post("/webhook", json=start_update(0, 1), headers={SECRET_HEADER: "wrong"})
+                assert denied.status == 401
+
+                responses = await asyncio.gather(*(
+                    client.post("/webhook", json=start_update(i, 1000 + i), headers={SECRET_HEADER: SECRET})
+                    for i in range(1, 201)
+                ))
+                assert [r.status for r in responses] == [200] * 200
+
+                await pool.queue.join()
+
+            await pool.stop()
+            await buffer.stop()
+            await bot.session.close()
+
+            assert len(batches) == 1
+            assert len(batches[0]) == 200
+            counts = await db.get_active_alert_counts(1000)
+            assert set(counts) == {1000 + i for i in range(1, 201)}
+            assert sum(1 for method, _ in calls if method == "sendMessage") == 200
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_answers_503(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(start_bot, "BOT_TOKEN", BOT_TOKEN)
+        monkeypatch.setattr(start_bot, "TELEGRAM_API_URL", "http://127.0.0.1:9")
+        bot = start_bot.create_bot()
+        # Без воркеров очередь не разбирается
+        pool = UpdateWorkerPool(bot, Dispatcher(), workers=0, queue_size=2)
+        await pool.start()
+
+        monitor = PriceMonitor(bot, None)
+        app = create_webhook_app(bot, pool, "/webhook", SECRET,
+                                 stats=lambda: {"price_monitor": monitor.stats()})
+        async with TestClient(TestServer(app)) as client:
+            statuses = []
+            for i in range(3):
+                response = await client.post("/webhook", json=start_update(i, i), headers={SECRET_HEADER: SECRET})
+                statuses.append(response.status)
+
+            health = await (await client.get(HEALTH_PATH)).json()
+
+        assert statuses == [200, 200, 503]
+        assert health["updates"] == {"depth": 2, "maxsize": 2, "workers": 0, "rejected": 1}
+        assert health["price_monitor"]["ticks"]["shed"] == 0
+        assert "degraded" in health["price_monitor"]["load"]
+        await bot.session.close()
+
+    asyncio.run(scenario())
@@ -1,14 +1,6 @@
-import sqlite3
-import aiosqlite
-from datetime import datetime
-from typing import List, Optional
-from bot.database import Database as BotDatabase
-from bot.models import PriceAlert
-from bot.config import DATABASE_PATH
+from bot.storage import Storage, create_storage
 
 
-# Используем ту же базу данных, что и бот
-class Database(BotDatabase):
-    def __init__(self, db_path: str = DATABASE_PATH):
-        super().__init__(db_path)
-
+def get_database() -> Storage:
+    """Хранилище веб-приложения (то же, что и у бота)"""
+    return create_storage()
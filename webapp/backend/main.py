@@ -1,17 +1,27 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
 from typing import List, Optional
 import os
-import httpx
 import asyncio
-import websockets
 import json
 
-from webapp.backend.database import Database
-from bot.config import CRYPTOCURRENCIES
+from bot.profiling import StartupProfiler
+
+profiler = StartupProfiler("webapp")
+
+with profiler.phase("import fastapi"):
+    from fastapi import FastAPI, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.staticfiles import StaticFiles
+    from fastapi.responses import FileResponse, Response
+    from pydantic import BaseModel
+
+with profiler.phase("import app modules"):
+    from webapp.backend.database import get_database
+    from bot.config import CRYPTOCURRENCIES, MAX_ALERTS_PER_USER, PROXY_MAX_VIEWERS
+    from bot.pipeline import ConnectionLimiter
+    from bot.user_registry import UserRegistry
+    from webapp.backend.serialization import AlertListCache, encode_alert, encode_alerts
+
+# httpx и websockets нужны только отдельным эндпоинтам и импортируются при первом обращении
 
 app = FastAPI(title="Crypto Alerts MiniApp API")
 
@@ -24,7 +34,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-db = Database()
+db = get_database()
+user_registry = UserRegistry(db)
+alerts_cache = AlertListCache()
+proxy_viewers = ConnectionLimiter("proxy_viewers", PROXY_MAX_VIEWERS)
+
+# Код закрытия WebSocket "Try Again Later"
+WS_TRY_AGAIN_LATER = 1013
+
+
+def json_response(payload: bytes) -> Response:
+    """Ответ с уже закодированным JSON, без повторной валидации через response_model"""
+    return Response(content=payload, media_type="application/json")
 
 
 # Pydantic модели для валидации
@@ -56,7 +77,37 @@ class AlertResponse(BaseModel):
 @app.on_event("startup")
 async def startup():
     """Инициализация базы данных при запуске"""
-    await db.init_db()
+    await profiler.timed("db init", db.init_db())
+    await profiler.timed("user cache warm", user_registry.warm())
+    # Изменения алертов из других реплик и бота (если хранилище их рассылает)
+    await db.listen_alert_changes(on_alert_change)
+    profiler.ready()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Закрытие соединений с хранилищем"""
+    await db.close()
+
+
+async def on_alert_change(user_id: Optional[int]):
+    """Сброс кэшей пользователя при изменении его алертов в другом процессе"""
+    if user_id is None:
+        alerts_cache.clear()
+        user_registry.invalidate_all_counts()
+        return
+    alerts_cache.invalidate(user_id)
+    user_registry.invalidate_count(user_id)
+
+
+@app.get("/api/health")
+async def health():
+    """Проверка готовности и профиль запуска"""
+    return {
+        "status": "ok",
+        "startup": profiler.as_dict(),
+        "proxy_viewers": proxy_viewers.stats(),
+    }
 
 
 @app.get("/api/cryptocurrencies")
@@ -70,6 +121,8 @@ async def get_candles(symbol: str = Query(..., description="Символ кри
                       interval: str = Query("1m", description="Интервал свечей"),
                       limit: int = Query(60, description="Количество свечей")):
     """Получение исторических данных свечей от Binance"""
+    import httpx
+
     try:
         async with httpx.AsyncClient() as client:
             response = await client.get(
@@ -106,19 +159,18 @@ async def get_candles(symbol: str = Query(..., description="Символ кри
 @app.get("/api/alerts", response_model=List[AlertResponse])
 async def get_alerts(user_id: int):
     """Получение всех алертов пользователя"""
+    payload = alerts_cache.get(user_id)
+    if payload is not None:
+        return json_response(payload)
+
+    if not await user_registry.ensure_user(user_id):
+        return json_response(b"[]")
+
+    generation = alerts_cache.generation(user_id)
     alerts = await db.get_user_alerts(user_id)
-    return [
-        AlertResponse(
-            id=alert.id,
-            user_id=alert.user_id,
-            cryptocurrency=alert.cryptocurrency,
-            target_price=alert.target_price,
-            is_above=alert.is_above,
-            created_at=alert.created_at.isoformat(),
-            is_active=alert.is_active
-        )
-        for alert in alerts
-    ]
+    payload = encode_alerts(alerts)
+    alerts_cache.set(user_id, payload, generation)
+    return json_response(payload)
 
 
 @app.post("/api/alerts", response_model=AlertResponse)
@@ -132,22 +184,28 @@ async def create_alert(user_id: int, alert_data: AlertCreate):
     if alert_data.target_price <= 0:
         raise HTTPException(status_code=400, detail="Цена должна быть положительным числом")
     
-    alert = await db.create_alert(
-        user_id=user_id,
-        cryptocurrency=alert_data.cryptocurrency.upper(),
-        target_price=alert_data.target_price,
-        is_above=alert_data.is_above
-    )
+    # Проверка пользователя и лимита алертов
+    if not await user_registry.ensure_user(user_id):
+        raise HTTPException(status_code=404, detail="Пользователь не найден, отправьте боту /start")
     
-    return AlertResponse(
-        id=alert.id,
-        user_id=alert.user_id,
-        cryptocurrency=alert.cryptocurrency,
-        target_price=alert.target_price,
-        is_above=alert.is_above,
-        created_at=alert.created_at.isoformat(),
-        is_active=alert.is_active
-    )
+    # Место резервируется до создания алерта, чтобы параллельные запросы не обошли лимит
+    if not await user_registry.reserve_alert(user_id):
+        raise HTTPException(status_code=429, detail=f"Достигнут лимит активных алертов ({MAX_ALERTS_PER_USER})")
+    
+    try:
+        alert = await db.create_alert(
+            user_id=user_id,
+            cryptocurrency=alert_data.cryptocurrency.upper(),
+            target_price=alert_data.target_price,
+            is_above=alert_data.is_above
+        )
+    except Exception:
+        user_registry.release_alert(user_id)
+        raise
+    user_registry.alert_created(user_id)
+    alerts_cache.invalidate(user_id)
+    
+    return json_response(encode_alert(alert))
 
 
 @app.put("/api/alerts/{alert_id}", response_model=AlertResponse)
@@ -176,16 +234,10 @@ async def update_alert(alert_id: int, user_id: int, alert_data: AlertUpdate):
         is_above=alert_data.is_above
     )
     
+    alerts_cache.invalidate(user_id)
+    
     updated_alert = await db.get_alert(alert_id)
-    return AlertResponse(
-        id=updated_alert.id,
-        user_id=updated_alert.user_id,
-        cryptocurrency=updated_alert.cryptocurrency,
-        target_price=updated_alert.target_price,
-        is_above=updated_alert.is_above,
-        created_at=updated_alert.created_at.isoformat(),
-        is_active=updated_alert.is_active
-    )
+    return json_response(encode_alert(updated_alert))
 
 
 @app.delete("/api/alerts/{alert_id}")
@@ -198,10 +250,16 @@ async def delete_alert(alert_id: int, user_id: int):
     
     if alert.user_id != user_id:
         raise HTTPException(status_code=403, detail="Нет доступа к этому алерту")
-    
-    success = await db.delete_alert(alert_id)
-    if not success:
-        raise HTTPException(status_code=500, detail="Ошибка при удалении алерта")
+
+    if not alert.is_active:
+        raise HTTPException(status_code=404, detail="Алерт не найден")
+
+    # Счетчик уменьшаем, только если алерт действительно был активен:
+    # повторное удаление или срабатывание в боте не освобождают место
+    if not await db.delete_alert(alert_id):
+        raise HTTPException(status_code=404, detail="Алерт не найден")
+    user_registry.alert_removed(user_id)
+    alerts_cache.invalidate(user_id)
     
     return {"message": "Алерт успешно удален"}
 
@@ -209,7 +267,16 @@ async def delete_alert(alert_id: int, user_id: int):
 @app.websocket("/ws/binance/{symbol}")
 async def websocket_binance_proxy(websocket: WebSocket, symbol: str):
     """Прокси для Binance WebSocket"""
+    import websockets
+
     await websocket.accept()
+
+    # Лишних зрителей отклоняем, а не открываем для них новые соединения с Binance
+    if not proxy_viewers.try_acquire():
+        print(f"Отклонен WebSocket клиент для {symbol}: достигнут лимит {PROXY_MAX_VIEWERS}")
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
+        return
+
     print(f"WebSocket клиент подключен для символа: {symbol}")
     
     # Формируем URL для Binance WebSocket
@@ -279,6 +346,7 @@ async def websocket_binance_proxy(websocket: WebSocket, symbol: str):
         traceback.print_exc()
     finally:
         client_connected = False
+        proxy_viewers.release()
         if binance_ws:
             try:
                 await binance_ws.close()
@@ -0,0 +1,92 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from bot.models import PriceAlert
+from bot.config import ALERTS_CACHE_SIZE, ALERTS_CACHE_TTL
+
+
+def alert_to_dict(alert: PriceAlert) -> Dict[str, object]:
+    """Представление алерта в формате AlertResponse"""
+    return {
+        "id": alert.id,
+        "user_id": alert.user_id,
+        "cryptocurrency": alert.cryptocurrency,
+        "target_price": alert.target_price,
+        "is_above": alert.is_above,
+        "created_at": alert.created_at.isoformat(),
+        "is_active": alert.is_active,
+    }
+
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_alert(alert: PriceAlert) -> bytes:
+    """JSON одного алерта"""
+    return _dumps(alert_to_dict(alert))
+
+
+def encode_alerts(alerts: Iterable[PriceAlert]) -> bytes:
+    """JSON списка алертов"""
+    return _dumps([alert_to_dict(alert) for alert in alerts])
+
+
+class AlertListCache:
+    """LRU-кэш готовых JSON-ответов со списком алертов пользователя.
+
+    Сбрасывается при изменении алертов пользователя через API. TTL
+    ограничивает устаревание, когда алерт деактивирует бот после срабатывания.
+    """
+
+    def __init__(self, capacity: int = ALERTS_CACHE_SIZE, ttl: float = ALERTS_CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, bytes]]" = OrderedDict()
+        # Поколение пользователя - номер его последнего сброса. Номера берутся
+        # из общего счетчика и не повторяются, поэтому старые поколения можно вытеснять
+        self._generations: "OrderedDict[int, int]" = OrderedDict()
+        self._invalidations = 0
+        # Номер последнего полного сброса: действует и на пользователей без записи в кэше
+        self._epoch = 0
+
+    def get(self, user_id: int) -> Optional[bytes]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return payload
+
+    def generation(self, user_id: int) -> int:
+        """Текущее поколение, читается перед запросом к БД"""
+        return max(self._generations.get(user_id, 0), self._epoch)
+
+    def set(self, user_id: int, payload: bytes, generation: Optional[int] = None):
+        """Сохранение ответа; если с момента чтения generation был сброс, данные устарели"""
+        if generation is not None and generation != self.generation(user_id):
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl, payload)
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Сброс всех записей, включая запросы к БД, начатые до сброса"""
+        self._entries.clear()
+        self._generations.clear()
+        self._invalidations += 1
+        self._epoch = self._invalidations
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+        self._invalidations += 1
+        self._generations[user_id] = self._invalidations
+        self._generations.move_to_end(user_id)
+        if len(self._generations) > self.capacity:
+            self._generations.popitem(last=False)